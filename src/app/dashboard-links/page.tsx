@@ -1,6 +1,6 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { ArrowRight, Trash2, RefreshCw } from 'lucide-react';
 
 type LinkItem = {
@@ -10,12 +10,46 @@ type LinkItem = {
   destination_name: string;
 };
 
+type StreamLink = {
+  source_id: string;
+  destination_id: string;
+  source_name: string | null;
+  destination_name: string | null;
+};
+
+type LinkCounters = {
+  forwarded: number;
+  failed: number;
+  dropped?: number;
+  queued?: number;
+  last_error: string | null;
+  last_forwarded_at: number | null;
+};
+
+type ForwarderStatus = {
+  running: boolean;
+  clients: number;
+  updated_at: number;
+};
+
+const linkKey = (sourceId: string, destId: string) => `${sourceId}:${destId}`;
+
+const toLinkItem = (link: StreamLink): LinkItem => ({
+  source_id: link.source_id,
+  destination_id: link.destination_id,
+  source_name: link.source_name ?? link.source_id,
+  destination_name: link.destination_name ?? link.destination_id,
+});
+
 export default function DashboardLinks() {
   const [links, setLinks] = useState<LinkItem[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [deleteLoading, setDeleteLoading] = useState<string | null>(null);
   const [refreshing, setRefreshing] = useState(false);
+  const [counters, setCounters] = useState<Record<string, LinkCounters>>({});
+  const [forwarder, setForwarder] = useState<ForwarderStatus | null>(null);
+  const eventSourceRef = useRef<EventSource | null>(null);
 
   const fetchLinks = async () => {
     setLoading(true);
@@ -45,8 +79,61 @@ export default function DashboardLinks() {
     }
   };
 
+  // Merge streamed links with the fetched list, keeping resolved names
+  const mergeLinks = (current: LinkItem[], incoming: StreamLink[]) => {
+    const known = new Map(current.map((link) => [linkKey(link.source_id, link.destination_id), link]));
+    return incoming.map((link) => known.get(linkKey(link.source_id, link.destination_id)) ?? toLinkItem(link));
+  };
+
+  const subscribe = () => {
+    const source = new EventSource('http://localhost:5001/link-events');
+
+    source.addEventListener('snapshot', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setLinks((current) => mergeLinks(current, data.links));
+      setForwarder(data.forwarder);
+      setCounters(data.counters);
+    });
+
+    source.addEventListener('links', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      const removed = new Set<string>(
+        data.removed.map((link: StreamLink) => linkKey(link.source_id, link.destination_id))
+      );
+      setLinks((current) => {
+        const kept = current.filter(
+          (link) => !removed.has(linkKey(link.source_id, link.destination_id))
+        );
+        const existing = new Set(kept.map((link) => linkKey(link.source_id, link.destination_id)));
+        const added = (data.added as StreamLink[])
+          .filter((link) => !existing.has(linkKey(link.source_id, link.destination_id)))
+          .map(toLinkItem);
+        return [...kept, ...added];
+      });
+    });
+
+    source.addEventListener('forwarder', (e) => {
+      setForwarder(JSON.parse((e as MessageEvent).data));
+    });
+
+    source.addEventListener('counters', (e) => {
+      const changed = JSON.parse((e as MessageEvent).data);
+      setCounters((current) => ({ ...current, ...changed }));
+    });
+
+    eventSourceRef.current = source;
+  };
+
   useEffect(() => {
-    fetchLinks();
+    // Fetch names once, then keep the list current from the event stream
+    let cancelled = false;
+    fetchLinks().then(() => {
+      if (!cancelled) subscribe();
+    });
+    return () => {
+      cancelled = true;
+      eventSourceRef.current?.close();
+    };
   }, []);
 
   const handleRefresh = () => {
@@ -90,7 +177,19 @@ export default function DashboardLinks() {
     <div className="p-2">
       <div className="tg-card p-5">
         <div className="flex justify-between items-center mb-5">
-          <h1 className="text-xl font-bold text-[var(--telegram-primary)]">Active Links</h1>
+          <div>
+            <h1 className="text-xl font-bold text-[var(--telegram-primary)]">Active Links</h1>
+            {forwarder && (
+              <p className="text-xs text-[var(--telegram-text-secondary)] flex items-center gap-1">
+                <span
+                  className={`inline-block w-2 h-2 rounded-full ${forwarder.running ? 'bg-green-500' : 'bg-gray-400'}`}
+                />
+                {forwarder.running
+                  ? `Forwarder running (${forwarder.clients} account${forwarder.clients === 1 ? '' : 's'})`
+                  : 'Forwarder stopped'}
+              </p>
+            )}
+          </div>
           <button 
             className="bg-[var(--telegram-primary)]/10 p-2 rounded-full text-[var(--telegram-primary)]"
             onClick={handleRefresh}
@@ -129,45 +228,64 @@ export default function DashboardLinks() {
           </div>
         ) : (
           <div className="space-y-3">
-            {links.map((link) => (
-              <div 
-                key={`${link.source_id}-${link.destination_id}`}
-                className="p-4 border border-gray-100 rounded-lg hover:shadow-sm transition"
-              >
-                <div className="flex items-center justify-between">
-                  <div className="flex-1 min-w-0">
-                    <p className="font-medium truncate" title={link.source_name}>
-                      {link.source_name}
-                    </p>
-                    <p className="text-xs text-[var(--telegram-text-secondary)]">
-                      ID: {link.source_id}
-                    </p>
+            {links.map((link) => {
+              const stats = counters[linkKey(link.source_id, link.destination_id)];
+              return (
+                <div 
+                  key={`${link.source_id}-${link.destination_id}`}
+                  className="p-4 border border-gray-100 rounded-lg hover:shadow-sm transition"
+                >
+                  <div className="flex items-center justify-between">
+                    <div className="flex-1 min-w-0">
+                      <p className="font-medium truncate" title={link.source_name}>
+                        {link.source_name}
+                      </p>
+                      <p className="text-xs text-[var(--telegram-text-secondary)]">
+                        ID: {link.source_id}
+                      </p>
+                    </div>
+                    
+                    <div className="px-3">
+                      <ArrowRight className="h-5 w-5 text-[var(--telegram-primary)]" />
+                    </div>
+                    
+                    <div className="flex-1 min-w-0">
+                      <p className="font-medium truncate" title={link.destination_name}>
+                        {link.destination_name}
+                      </p>
+                      <p className="text-xs text-[var(--telegram-text-secondary)]">
+                        ID: {link.destination_id}
+                      </p>
+                    </div>
+                    
+                    <button
+                      onClick={() => handleDelete(link.source_id, link.destination_id)}
+                      disabled={deleteLoading === `${link.source_id}-${link.destination_id}`}
+                      className="ml-2 p-2 text-red-500 hover:bg-red-50 rounded-full transition-colors"
+                      aria-label="Delete Link"
+                    >
+                      <Trash2 size={18} />
+                    </button>
                   </div>
-                  
-                  <div className="px-3">
-                    <ArrowRight className="h-5 w-5 text-[var(--telegram-primary)]" />
-                  </div>
-                  
-                  <div className="flex-1 min-w-0">
-                    <p className="font-medium truncate" title={link.destination_name}>
-                      {link.destination_name}
-                    </p>
-                    <p className="text-xs text-[var(--telegram-text-secondary)]">
-                      ID: {link.destination_id}
-                    </p>
-                  </div>
-                  
-                  <button
-                    onClick={() => handleDelete(link.source_id, link.destination_id)}
-                    disabled={deleteLoading === `${link.source_id}-${link.destination_id}`}
-                    className="ml-2 p-2 text-red-500 hover:bg-red-50 rounded-full transition-colors"
-                    aria-label="Delete Link"
-                  >
-                    <Trash2 size={18} />
-                  </button>
+
+                  {stats && (
+                    <div className="mt-2 text-xs text-[var(--telegram-text-secondary)]">
+                      <p>
+                        {stats.forwarded} forwarded
+                        {stats.failed > 0 && ` · ${stats.failed} failed`}
+                        {!!stats.dropped && ` · ${stats.dropped} dropped`}
+                        {!!stats.queued && ` · ${stats.queued} queued`}
+                      </p>
+                      {stats.last_error && (
+                        <p className="text-red-500 truncate" title={stats.last_error}>
+                          Last error: {stats.last_error}
+                        </p>
+                      )}
+                    </div>
+                  )}
                 </div>
-              </div>
-            ))}
+              );
+            })}
           </div>
         )}
       </div>
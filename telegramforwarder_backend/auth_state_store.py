@@ -0,0 +1,250 @@
+# auth_state_store.py
+
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger("auth_state_store")
+
+CODE_HASH_TTL = 10 * 60      # Telegram login codes expire after a few minutes
+SESSION_TTL = 60 * 60        # Session file handles are forgotten after an hour
+LOCK_TTL = 60                # Lease length, renewed while the holder is alive
+LOCK_TIMEOUT = 5 * 60        # Give up waiting for a lock after this long
+ENTITY_NAME_TTL = 24 * 60 * 60  # Chat names change rarely
+MAX_ENTRIES = 10000
+
+class MemoryLock:
+    """In-process lock that tracks how many callers still intend to use it"""
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()
+        # Callers that got this lock from get_lock() and have not released it yet
+        self.users = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.lock.release()
+        with self.store.mutex:
+            self.users -= 1
+
+
+class MemoryStateStore:
+    """Per-process auth state with TTL expiry and LRU eviction.
+
+    Each namespace is bounded separately, so filling one (e.g. cached chat
+    names) never evicts entries of another (e.g. pending code hashes).
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.namespaces = {}
+        self.locks = OrderedDict()
+        self.mutex = threading.Lock()
+
+    def _purge(self, values, now):
+        expired = [key for key, (_, expires_at) in values.items() if expires_at <= now]
+        for key in expired:
+            del values[key]
+        while len(values) > self.max_entries:
+            values.popitem(last=False)
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self.mutex:
+            values = self.namespaces.get(namespace, {})
+            item = values.get(key)
+            if item is None:
+                return None
+            if item[1] <= now:
+                del values[key]
+                return None
+            values.move_to_end(key)
+            return item[0]
+
+    def set(self, namespace, key, value, ttl):
+        now = time.time()
+        with self.mutex:
+            values = self.namespaces.setdefault(namespace, OrderedDict())
+            values[key] = (value, now + ttl)
+            values.move_to_end(key)
+            self._purge(values, now)
+
+    def delete(self, namespace, key):
+        with self.mutex:
+            self.namespaces.get(namespace, {}).pop(key, None)
+
+    def get_lock(self, key):
+        """Return the lock for key, to be used in exactly one `with` block"""
+        with self.mutex:
+            lock = self.locks.get(key)
+            if lock is None:
+                lock = MemoryLock(self)
+                self.locks[key] = lock
+            lock.users += 1
+            self.locks.move_to_end(key)
+            # Evict the least recently used locks that nobody holds or waits for
+            if len(self.locks) > self.max_entries:
+                for old_key in list(self.locks):
+                    if len(self.locks) <= self.max_entries:
+                        break
+                    if self.locks[old_key].users == 0:
+                        del self.locks[old_key]
+            return lock
+
+
+class SQLiteLock:
+    """Cross-process lock backed by a lease row in the state database.
+
+    The lease is renewed by a background thread while the lock is held, so it
+    only expires if the holding process dies.
+    """
+
+    def __init__(self, store, key, ttl=LOCK_TTL, timeout=LOCK_TIMEOUT, poll_interval=0.05):
+        self.store = store
+        self.key = key
+        self.ttl = ttl
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}:{threading.get_ident()}:{id(self)}"
+        self.stop_renewing = threading.Event()
+        self.renewer = None
+
+    def acquire(self):
+        deadline = time.time() + self.timeout
+        while True:
+            now = time.time()
+            with self.store.connect() as conn:
+                conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (self.key, self.owner, now + self.ttl),
+                )
+                if cursor.rowcount == 1:
+                    break
+            if now >= deadline:
+                raise TimeoutError(f"Timed out waiting for lock on {self.key}")
+            time.sleep(self.poll_interval)
+
+        self.stop_renewing.clear()
+        self.renewer = threading.Thread(target=self.renew, daemon=True)
+        self.renewer.start()
+        return True
+
+    def renew(self):
+        while not self.stop_renewing.wait(self.ttl / 3):
+            try:
+                with self.store.connect() as conn:
+                    conn.execute(
+                        "UPDATE locks SET expires_at = ? WHERE key = ? AND owner = ?",
+                        (time.time() + self.ttl, self.key, self.owner),
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Failed to renew lock on {self.key}: {str(e)}")
+
+    def release(self):
+        self.stop_renewing.set()
+        if self.renewer is not None:
+            self.renewer.join()
+            self.renewer = None
+        with self.store.connect() as conn:
+            conn.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (self.key, self.owner))
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class SQLiteStateStore:
+    """Auth state in a local SQLite file, shared between worker processes on one host"""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS locks ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def connect(self):
+        # A short-lived connection per call keeps this safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE state SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            return row[0]
+
+    def set(self, namespace, key, value, ttl):
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+            # Bound each namespace separately, like MemoryStateStore
+            conn.execute(
+                "DELETE FROM state WHERE rowid IN ("
+                "SELECT rowid FROM state WHERE namespace = ? "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, self.max_entries),
+            )
+
+    def delete(self, namespace, key):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def get_lock(self, key):
+        return SQLiteLock(self, key)
+
+
+def create_state_store():
+    """Build the store selected by AUTH_STATE_BACKEND ("memory" or "sqlite")"""
+    backend = (os.getenv("AUTH_STATE_BACKEND") or "memory").lower()
+    max_entries = int(os.getenv("AUTH_STATE_MAX_ENTRIES") or MAX_ENTRIES)
+    if backend == "sqlite":
+        path = os.getenv("AUTH_STATE_PATH") or "auth_state.db"
+        logger.info(f"Using SQLite auth state store at {path}")
+        return SQLiteStateStore(path, max_entries=max_entries)
+    if backend != "memory":
+        logger.warning(f"Unknown AUTH_STATE_BACKEND '{backend}', falling back to memory")
+    return MemoryStateStore(max_entries=max_entries)
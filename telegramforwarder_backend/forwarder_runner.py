@@ -1,5 +1,9 @@
 # forwarder_runner.py
 
+from startup_profiler import profiler, MessageProfiler
+
+profiler.begin("imports")
+import argparse
 import asyncio
 import json
 import os
@@ -7,9 +11,13 @@ import logging
 from telethon import TelegramClient, events
 from telethon.sessions.memory import MemorySession
 from dotenv import load_dotenv
+from send_scheduler import SendScheduler, DEFAULT_PRIORITY
 import signal
 import sys
 import time
+profiler.end("imports")
+
+profiler.begin("config load")
 
 # Configure logging
 logging.basicConfig(
@@ -28,11 +36,24 @@ API_ID = int(os.getenv("TG_API_ID") or "YOUR_API_ID")
 API_HASH = os.getenv("TG_API_HASH") or "YOUR_API_HASH"
 SESSION_DIR = "sessions"
 REDIRECT_FILE = "active_redirections.json"
+LINK_SETTINGS_FILE = "link_settings.json"
+STATUS_FILE = "forwarder_status.json"
+STATUS_INTERVAL = 2  # seconds between status file writes
+SETTINGS_POLL_INTERVAL = 2  # seconds between checks for changed link settings
 
 os.makedirs(SESSION_DIR, exist_ok=True)
 
+profiler.end("config load")
+
+# Samples message handling and sending with cProfile when --profile-handler is given
+message_profiler = MessageProfiler()
+
 # Global variables for handling graceful shutdown
 running_clients = []
+running_schedulers = []
+
+# Per-link counters published to STATUS_FILE for the dashboard
+link_stats = {}
 shutdown_event = asyncio.Event()
 
 def handle_signals():
@@ -47,6 +68,9 @@ def handle_shutdown(sig):
 
 async def cleanup():
     """Cleanup resources before shutdown"""
+    await asyncio.gather(*[scheduler.stop() for scheduler in running_schedulers])
+    write_status(running=False)
+    message_profiler.dump()
     logger.info(f"Disconnecting {len(running_clients)} clients...")
     await asyncio.gather(*[client.disconnect() for client in running_clients])
     logger.info("All clients disconnected")
@@ -58,11 +82,64 @@ async def forward_message(client, source_id, destination_id, message):
         log_message = message[:30] + "..." if len(message) > 30 else message
         logger.info(f"Forwarding: {source_id} → {destination_id}: {log_message}")
         await client.send_message(int(destination_id), message)
+        record_link_stat(source_id, destination_id)
         return True
     except Exception as e:
         logger.error(f"Failed to forward from {source_id} to {destination_id}: {str(e)}")
+        record_link_stat(source_id, destination_id, error=str(e))
         return False
 
+def new_link_stats():
+    return {
+        "forwarded": 0,
+        "failed": 0,
+        "last_error": None,
+        "last_forwarded_at": None,
+    }
+
+def record_link_stat(source_id, destination_id, error=None):
+    """Update the forwarded/failed counters for a link"""
+    stats = link_stats.setdefault(f"{source_id}:{destination_id}", new_link_stats())
+    if error is None:
+        stats["forwarded"] += 1
+        stats["last_forwarded_at"] = time.time()
+    else:
+        stats["failed"] += 1
+        stats["last_error"] = error
+
+def write_status(running=True):
+    """Write forwarder status and per-link counters for the API to stream"""
+    links = {key: dict(stats) for key, stats in link_stats.items()}
+    for scheduler in running_schedulers:
+        for (source_id, dest_id), link in scheduler.links.items():
+            stats = links.setdefault(f"{source_id}:{dest_id}", new_link_stats())
+            stats["dropped"] = stats.get("dropped", 0) + link.dropped
+            stats["queued"] = stats.get("queued", 0) + len(link.messages)
+
+    status = {
+        "running": running,
+        "pid": os.getpid(),
+        "clients": len(running_clients),
+        "updated_at": time.time(),
+        "links": links,
+    }
+    try:
+        temp_file = f"{STATUS_FILE}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(status, f)
+        os.replace(temp_file, STATUS_FILE)
+    except Exception as e:
+        logger.error(f"Failed to write status file: {str(e)}")
+
+async def status_writer():
+    """Periodically publish status until shutdown"""
+    while not shutdown_event.is_set():
+        write_status()
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), timeout=STATUS_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
 def load_redirections():
     """Load redirections with error handling"""
     if not os.path.exists(REDIRECT_FILE):
@@ -83,6 +160,51 @@ def load_redirections():
         logger.error(f"Unexpected error loading redirections: {str(e)}")
         return {}
 
+def load_link_settings():
+    """Load per-link scheduling settings (priority, max_age) with error handling"""
+    if not os.path.exists(LINK_SETTINGS_FILE):
+        return {}
+
+    try:
+        with open(LINK_SETTINGS_FILE, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading link settings: {str(e)}")
+        return {}
+
+def apply_link_settings(scheduler, link_settings):
+    """Set priority and max_age on every link of a scheduler"""
+    for source_id, dest_id in list(scheduler.links):
+        settings = link_settings.get(f"{source_id}:{dest_id}", {})
+        scheduler.configure_link(
+            source_id,
+            dest_id,
+            priority=settings.get("priority", DEFAULT_PRIORITY),
+            max_age=settings.get("max_age"),
+        )
+
+def get_link_settings_mtime():
+    try:
+        return os.path.getmtime(LINK_SETTINGS_FILE)
+    except OSError:
+        return None
+
+async def watch_link_settings():
+    """Apply link setting changes from the API without a restart"""
+    last_mtime = get_link_settings_mtime()
+    while not shutdown_event.is_set():
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), timeout=SETTINGS_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        mtime = get_link_settings_mtime()
+        if mtime != last_mtime:
+            last_mtime = mtime
+            link_settings = load_link_settings()
+            for scheduler in running_schedulers:
+                apply_link_settings(scheduler, link_settings)
+            logger.info("Reloaded link settings")
+
 async def setup_client(session_path):
     """Set up a single client with its event handlers"""
     try:
@@ -92,6 +214,7 @@ async def setup_client(session_path):
         
         logger.info(f"Starting client for session: {session_name}")
         
+        profiler.begin("client connect")
         # Use memory session to avoid SQLite locking issues
         # but load data from the file session
         for attempt in range(3):
@@ -109,6 +232,7 @@ async def setup_client(session_path):
                     break
                 else:
                     await file_client.disconnect()
+                    profiler.end("client connect")
                     logger.warning(f"Client {session_name} is not authorized. Skipping.")
                     return None
             except Exception as e:
@@ -118,7 +242,9 @@ async def setup_client(session_path):
                 else:
                     raise
         
-        if not await client.is_user_authorized():
+        authorized = await client.is_user_authorized()
+        profiler.end("client connect")
+        if not authorized:
             logger.warning(f"Client {session_name} is not authorized even after loading. Skipping.")
             await client.disconnect()
             return None
@@ -127,24 +253,46 @@ async def setup_client(session_path):
         running_clients.append(client)
         
         # Load redirections for this client
+        profiler.begin("config load")
         redirections = load_redirections()
+        link_settings = load_link_settings()
+        profiler.end("config load")
+
+        # Schedule sends across this account's links by priority
+        async def send(source_id, destination_id, message):
+            with message_profiler.sample():
+                await forward_message(client, source_id, destination_id, message)
+
+        profiler.begin("scheduler startup")
+        scheduler = SendScheduler(send, name=session_name)
+        for source_id, dest_ids in redirections.items():
+            for dest_id in dest_ids:
+                scheduler.configure_link(source_id, dest_id)
+        apply_link_settings(scheduler, link_settings)
+        scheduler.start(shutdown_event)
+        running_schedulers.append(scheduler)
+        profiler.end("scheduler startup")
         
         # Set up message handler
+        profiler.begin("handler registration")
         @client.on(events.NewMessage())
         async def message_handler(event):
             if shutdown_event.is_set():
                 return
                 
-            chat_id = str(event.chat_id)
-            if chat_id in redirections:
-                message_text = event.message.message
-                if message_text:  # Only forward non-empty text messages
-                    for dest_id in redirections[chat_id]:
-                        await forward_message(client, chat_id, dest_id, message_text)
+            with message_profiler.sample():
+                chat_id = str(event.chat_id)
+                if chat_id in redirections:
+                    message_text = event.message.message
+                    if message_text:  # Only forward non-empty text messages
+                        for dest_id in redirections[chat_id]:
+                            scheduler.enqueue(chat_id, dest_id, message_text)
+        profiler.end("handler registration")
         
         logger.info(f"Client {session_name} started successfully")
         return client
     except Exception as e:
+        profiler.end_open()
         logger.error(f"Error setting up client {os.path.basename(session_path)}: {str(e)}")
         return None
 
@@ -156,11 +304,13 @@ async def main():
     handle_signals()
     
     # Get all session files
+    profiler.begin("session discovery")
     session_files = [
         os.path.join(SESSION_DIR, f) 
         for f in os.listdir(SESSION_DIR) 
         if f.endswith(".session")
     ]
+    profiler.end("session discovery")
     
     if not session_files:
         logger.warning("No session files found. Exiting.")
@@ -180,15 +330,40 @@ async def main():
         return
     
     logger.info(f"✅ Successfully loaded {len(clients)} Telegram clients")
+    profiler.report("Forwarder startup")
     logger.info("Listening for messages (Press Ctrl+C to stop)...")
     
     # Keep running until shutdown signal
+    status_task = asyncio.ensure_future(status_writer())
+    settings_task = asyncio.ensure_future(watch_link_settings())
     try:
         await shutdown_event.wait()
     finally:
+        await asyncio.gather(status_task, settings_task)
         await cleanup()
 
+def sample_rate(value):
+    """argparse type for a sampling fraction between 0 and 1"""
+    try:
+        rate = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value}")
+    if not 0 <= rate <= 1:
+        raise argparse.ArgumentTypeError(f"rate must be between 0 and 1, got {value}")
+    return rate
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telegram message forwarder")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report per-phase startup timings")
+    parser.add_argument("--profile-handler", type=sample_rate, default=0.0, metavar="RATE",
+                        help="Profile this fraction (0-1) of message handler and send calls with cProfile")
+    parser.add_argument("--profile-output", default="handler.prof",
+                        help="Where to write the message handler profile on shutdown")
+    args = parser.parse_args()
+    profiler.enabled = args.profile_startup
+    message_profiler.configure(args.profile_handler, args.profile_output)
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,180 @@
+# link_events.py
+
+import json
+import os
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger("link_events")
+
+POLL_INTERVAL = 1
+FORWARDER_STALE_AFTER = 10  # seconds without a status update before the forwarder is shown as stopped
+MAX_PENDING_EVENTS = 100
+
+def read_json_file(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+def get_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """Pending events for one connected client"""
+
+    def __init__(self, max_pending=MAX_PENDING_EVENTS):
+        self.max_pending = max_pending
+        self.events = deque()
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def push(self, message):
+        with self.condition:
+            if len(self.events) >= self.max_pending:
+                # The client is not keeping up; end its stream so it
+                # reconnects and starts again from a fresh snapshot
+                self.events.clear()
+                self.closed = True
+            else:
+                self.events.append(message)
+            self.condition.notify()
+
+    def next(self, timeout):
+        """Return the next event, or None after timeout or once closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.events or self.closed, timeout)
+            return self.events.popleft() if self.events else None
+
+
+class LinkEventHub:
+    """Watches the redirection and forwarder status files for all subscribers.
+
+    A single background thread polls the files while anyone is subscribed
+    and fans deltas out to every subscription, so the polling cost does not
+    grow with the number of open dashboards.
+    """
+
+    def __init__(self, redirection_file, status_file, name_lookup, poll_interval=POLL_INTERVAL):
+        self.redirection_file = redirection_file
+        self.status_file = status_file
+        self.name_lookup = name_lookup
+        self.poll_interval = poll_interval
+        self.links_mtime = None
+        self.status_mtime = None
+        self.links = set()
+        self.status = {}
+        self.forwarder = None
+        self.counters = {}
+        self.subscribers = set()
+        self.mutex = threading.Lock()
+        self.watcher = None
+
+    def link_payload(self, source_id, destination_id):
+        return {
+            "source_id": source_id,
+            "destination_id": destination_id,
+            "source_name": self.name_lookup(source_id),
+            "destination_name": self.name_lookup(destination_id),
+        }
+
+    def forwarder_payload(self):
+        updated_at = self.status.get("updated_at") or 0
+        return {
+            "running": bool(self.status.get("running")) and time.time() - updated_at < FORWARDER_STALE_AFTER,
+            "clients": self.status.get("clients", 0),
+            "updated_at": updated_at,
+        }
+
+    def poll(self):
+        """Refresh state from disk and return the delta events since the last poll"""
+        messages = []
+
+        # Redirections are re-read from disk so changes made by any worker show up
+        mtime = get_mtime(self.redirection_file)
+        if mtime != self.links_mtime:
+            self.links_mtime = mtime
+            redirections = read_json_file(self.redirection_file, {})
+            current = {(sid, did) for sid, dests in redirections.items() for did in dests}
+            added = sorted(current - self.links)
+            removed = sorted(self.links - current)
+            self.links = current
+            if added or removed:
+                messages.append(format_event("links", {
+                    "added": [self.link_payload(sid, did) for sid, did in added],
+                    "removed": [{"source_id": sid, "destination_id": did} for sid, did in removed],
+                }))
+
+        mtime = get_mtime(self.status_file)
+        status_changed = mtime != self.status_mtime
+        self.status_mtime = mtime
+        if status_changed:
+            self.status = read_json_file(self.status_file, {})
+
+        # Recomputed every poll since the forwarder goes stale without the file changing
+        forwarder = self.forwarder_payload()
+        if self.forwarder is not None and (
+            forwarder["running"] != self.forwarder["running"]
+            or forwarder["clients"] != self.forwarder["clients"]
+        ):
+            messages.append(format_event("forwarder", forwarder))
+        self.forwarder = forwarder
+
+        if status_changed:
+            counters = self.status.get("links", {})
+            changed = {
+                key: value for key, value in counters.items()
+                if self.counters.get(key) != value
+            }
+            self.counters = counters
+            if changed:
+                messages.append(format_event("counters", changed))
+
+        return messages
+
+    def watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.mutex:
+                if not self.subscribers:
+                    self.watcher = None
+                    return
+                try:
+                    messages = self.poll()
+                except Exception as e:
+                    logger.error(f"Error polling link state: {str(e)}")
+                    continue
+                for message in messages:
+                    for subscription in self.subscribers:
+                        subscription.push(message)
+
+    def subscribe(self):
+        """Register a subscription and return it with the current snapshot event"""
+        with self.mutex:
+            if self.watcher is None:
+                # Nobody was watching, so bring the state up to date first
+                self.poll()
+                self.watcher = threading.Thread(target=self.watch, daemon=True)
+                self.watcher.start()
+            subscription = Subscription()
+            self.subscribers.add(subscription)
+            snapshot = format_event("snapshot", {
+                "links": [self.link_payload(sid, did) for sid, did in sorted(self.links)],
+                "forwarder": self.forwarder,
+                "counters": self.counters,
+            })
+        return snapshot, subscription
+
+    def unsubscribe(self, subscription):
+        with self.mutex:
+            self.subscribers.discard(subscription)
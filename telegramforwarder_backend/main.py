@@ -1,14 +1,21 @@
 # main.py
+from startup_profiler import profiler
+
+profiler.begin("imports")
+import argparse
 from flask import Flask, jsonify
 from flask_cors import CORS
 from regex_trainer_api import app as regex_app
 from telegram_auth_api import auth_api
+profiler.end("imports")
 
+profiler.begin("app setup")
 app = Flask(__name__)
 # Allow all origins during debugging
 CORS(app, supports_credentials=True, origins=["*"])
 app.register_blueprint(regex_app)
 app.register_blueprint(auth_api, url_prefix='/')  # Applies to /send-code, /verify-code, etc.
+profiler.end("app setup")
 
 @app.route('/ping', methods=['GET', 'OPTIONS'])
 def ping():
@@ -16,6 +23,12 @@ def ping():
     return jsonify({"status": "Server is running"}), 200
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Telegram Forwarder backend server")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report how long imports and module-level setup took")
+    args = parser.parse_args()
+    profiler.enabled = args.profile_startup
+    profiler.report("Backend startup")
     print("Starting Telegram Forwarder backend server on port 5001...")
     print("API endpoints available:")
     print("  - /ping (GET) - Check if server is running")
@@ -25,4 +38,5 @@ if __name__ == '__main__':
     print("  - /set-link (POST) - Create forwarding rule")
     print("  - /get-links (POST) - Get active links")
     print("  - /delete-link (POST) - Delete a link")
+    print("  - /link-events (GET) - Stream link changes, forwarder status and counters")
     app.run(host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,142 @@
+# send_scheduler.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger("send_scheduler")
+
+DEFAULT_PRIORITY = 1
+MAX_QUEUE_PER_LINK = 1000
+
+class LinkQueue:
+    """Pending messages for a single source → destination link"""
+
+    def __init__(self, source_id, destination_id, priority=DEFAULT_PRIORITY, max_age=None):
+        self.source_id = source_id
+        self.destination_id = destination_id
+        self.priority = max(1, int(priority))
+        # Stale messages are only dropped on links with an explicit max_age
+        self.max_age = max_age
+        self.messages = deque()
+        # Virtual finish time of the last message scheduled on this link
+        self.last_finish = 0.0
+        # Finish tag of the message at the head of the queue, fixed once assigned
+        self.head_finish = None
+        self.dropped = 0
+
+    def drop_stale(self, now):
+        """Drop queued messages older than max_age, returns the number dropped"""
+        if not self.max_age:
+            return 0
+        count = 0
+        while self.messages and now - self.messages[0][0] > self.max_age:
+            self.messages.popleft()
+            count += 1
+        self.dropped += count
+        return count
+
+
+class SendScheduler:
+    """Weighted fair queuing of outgoing messages across links of one account.
+
+    Each link gets a share of the account's send budget proportional to its
+    priority, so a noisy low-priority link cannot starve a high-priority one.
+    Messages are sent one at a time by a single worker task per account.
+    """
+
+    def __init__(self, send, name="scheduler"):
+        self.send = send
+        self.name = name
+        self.links = {}
+        self.virtual_time = 0.0
+        self.wakeup = asyncio.Event()
+        self.worker = None
+
+    def configure_link(self, source_id, destination_id, priority=DEFAULT_PRIORITY, max_age=None):
+        key = (str(source_id), str(destination_id))
+        link = self.links.get(key)
+        if link is None:
+            link = LinkQueue(key[0], key[1], priority, max_age)
+            self.links[key] = link
+        else:
+            link.priority = max(1, int(priority))
+            link.max_age = max_age
+        return link
+
+    def enqueue(self, source_id, destination_id, message):
+        """Queue a message for sending and wake the worker"""
+        key = (str(source_id), str(destination_id))
+        link = self.links.get(key) or self.configure_link(*key)
+        if len(link.messages) >= MAX_QUEUE_PER_LINK:
+            link.messages.popleft()
+            link.dropped += 1
+            logger.warning(f"[{self.name}] Queue full for {key[0]} → {key[1]}, dropped oldest message")
+        link.messages.append((time.monotonic(), message))
+        self.wakeup.set()
+
+    def pending(self):
+        return sum(len(link.messages) for link in self.links.values())
+
+    def next_link(self):
+        """Pick the backlogged link with the smallest virtual finish time"""
+        now = time.monotonic()
+        best = None
+        best_finish = None
+        for link in self.links.values():
+            dropped = link.drop_stale(now)
+            if dropped:
+                logger.warning(
+                    f"[{self.name}] Dropped {dropped} stale message(s) for "
+                    f"{link.source_id} → {link.destination_id}"
+                )
+            if not link.messages:
+                link.head_finish = None
+                continue
+            if link.head_finish is None:
+                link.head_finish = max(self.virtual_time, link.last_finish) + 1.0 / link.priority
+            finish = link.head_finish
+            if best is None or finish < best_finish or (
+                finish == best_finish and link.priority > best.priority
+            ):
+                best = link
+                best_finish = finish
+        if best is not None:
+            best.last_finish = best_finish
+            best.head_finish = None
+            self.virtual_time = max(self.virtual_time, best_finish - 1.0 / best.priority)
+        return best
+
+    async def run(self, shutdown_event):
+        """Drain queued messages until shutdown is requested"""
+        while not shutdown_event.is_set():
+            link = self.next_link()
+            if link is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            _, message = link.messages.popleft()
+            try:
+                await self.send(link.source_id, link.destination_id, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # One failed message must not stop forwarding for the whole account
+                logger.error(
+                    f"[{self.name}] Error sending {link.source_id} → {link.destination_id}: {str(e)}"
+                )
+
+    def start(self, shutdown_event):
+        if self.worker is None:
+            self.worker = asyncio.ensure_future(self.run(shutdown_event))
+        return self.worker
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
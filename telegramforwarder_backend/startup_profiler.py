@@ -0,0 +1,105 @@
+# startup_profiler.py
+
+import cProfile
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("startup_profiler")
+
+class StartupProfiler:
+    """Collects wall-clock timings for named startup phases.
+
+    Phases are always timed (the overhead is a couple of perf_counter calls),
+    but only reported once the entry point sets enabled. Phases with the same
+    name are summed, so per-client work adds up across sessions.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.created = time.perf_counter()
+        self.phases = {}
+        self.started = {}
+        self.depth = 0
+
+    def begin(self, name):
+        # Register on first use so the report lists phases in start order
+        self.phases.setdefault(name, (0.0, 0, self.depth))
+        self.started[name] = (time.perf_counter(), self.depth)
+        self.depth += 1
+
+    def end(self, name):
+        if name not in self.started:
+            return
+        start, _ = self.started.pop(name)
+        self.depth -= 1
+        total, count, depth = self.phases[name]
+        self.phases[name] = (total + time.perf_counter() - start, count + 1, depth)
+
+    def end_open(self):
+        """End any phases still running, e.g. after an exception"""
+        for name in list(self.started):
+            self.end(name)
+
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def report(self, title="Startup"):
+        if not self.enabled:
+            return
+        lines = [f"{title} profile (total {(time.perf_counter() - self.created) * 1000:.1f} ms):"]
+        for name, (total, count, depth) in self.phases.items():
+            calls = f" x{count}" if count > 1 else ""
+            lines.append(f"  {'  ' * depth}{name:<{30 - 2 * depth}} {total * 1000:9.1f} ms{calls}")
+        logger.info("\n".join(lines))
+
+
+class MessageProfiler:
+    """Runs cProfile on a random sample of message handling and sending.
+
+    Samples that await (such as sends) also record whatever other tasks
+    run on the event loop in the meantime.
+    """
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.output = "handler.prof"
+        self.profile = None
+        self.active = False
+        self.sampled = 0
+
+    def configure(self, sample_rate, output):
+        self.sample_rate = sample_rate
+        self.output = output
+        self.profile = cProfile.Profile() if sample_rate > 0 else None
+
+    @contextmanager
+    def sample(self):
+        # cProfile cannot be enabled twice, so overlapping samples are skipped
+        if self.profile is None or self.active or random.random() >= self.sample_rate:
+            yield
+            return
+        self.sampled += 1
+        self.active = True
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+            self.active = False
+
+    def dump(self):
+        if self.profile is None or not self.sampled:
+            return
+        self.profile.dump_stats(self.output)
+        logger.info(f"Wrote profile of {self.sampled} sampled message(s) to {self.output}")
+
+
+# Shared instance so modules imported during startup can record their own phases
+profiler = StartupProfiler()
@@ -1,15 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from telethon import TelegramClient, events
 from telethon.tl.types import PeerUser, PeerChat, PeerChannel
-from telethon.sessions.memory import MemorySession
 from dotenv import load_dotenv
-import os, asyncio, traceback, json
-import threading
+import os, asyncio, traceback, json, math
 import logging
 from datetime import datetime
 import hashlib
 import time
+from auth_state_store import create_state_store, CODE_HASH_TTL, SESSION_TTL, ENTITY_NAME_TTL
+from startup_profiler import profiler
+from link_events import LinkEventHub
+
+profiler.begin("config load")
 
 # Configure logging
 logging.basicConfig(
@@ -24,8 +27,9 @@ logger = logging.getLogger("telegram_auth_api")
 
 load_dotenv()
 
-session_locks = {}
-memory_sessions = {}  # Store sessions in memory to avoid file locks
+# Code hashes, locks and session file handles live in a pluggable store so that
+# several API workers can share them and entries expire
+state_store = create_state_store()
 
 auth_api = Blueprint('auth_api', __name__)
 # Enable CORS for all origins for debugging
@@ -36,9 +40,6 @@ API_HASH = os.getenv("TG_API_HASH") or "YOUR_API_HASH"
 SESSION_PATH = "sessions"
 os.makedirs(SESSION_PATH, exist_ok=True)
 
-# Store phone_code_hash temporarily
-phone_code_hashes = {}
-
 # Load saved redirections
 REDIRECTION_FILE = "active_redirections.json"
 if os.path.exists(REDIRECTION_FILE):
@@ -47,6 +48,54 @@ if os.path.exists(REDIRECTION_FILE):
 else:
     active_redirections = {}
 
+# Per-link scheduling settings used by the forwarder, keyed by "source:destination"
+LINK_SETTINGS_FILE = "link_settings.json"
+
+profiler.end("config load")
+
+# Status and per-link counters written by forwarder_runner
+FORWARDER_STATUS_FILE = "forwarder_status.json"
+EVENT_KEEPALIVE_INTERVAL = 15
+
+# Shared watcher behind /link-events
+link_event_hub = LinkEventHub(
+    REDIRECTION_FILE,
+    FORWARDER_STATUS_FILE,
+    lambda entity_id: state_store.get("entity_name", entity_id),
+)
+
+def load_link_settings():
+    if not os.path.exists(LINK_SETTINGS_FILE):
+        return {}
+    with open(LINK_SETTINGS_FILE, "r") as f:
+        return json.load(f)
+
+def save_link_settings(link_settings):
+    temp_file = f"{LINK_SETTINGS_FILE}.tmp.{os.getpid()}"
+    with open(temp_file, "w") as f:
+        json.dump(link_settings, f)
+    os.replace(temp_file, LINK_SETTINGS_FILE)
+    logger.info(f"Saved link settings to {LINK_SETTINGS_FILE}")
+
+def update_link_settings(source_id, destination_id, changes=None):
+    """Merge changes into a link's settings, or remove them when changes is None.
+
+    The file is re-read under a lock shared by all API workers, so concurrent
+    updates from different workers are not lost.
+    """
+    key = f"{source_id}:{destination_id}"
+    with state_store.get_lock("link_settings"):
+        link_settings = load_link_settings()
+        if changes is None:
+            if link_settings.pop(key, None) is None:
+                return None
+            settings = None
+        else:
+            settings = link_settings.setdefault(key, {})
+            settings.update(changes)
+        save_link_settings(link_settings)
+        return settings
+
 def save_redirections():
     # Create a temporary file and then rename to avoid corruption
     temp_file = f"{REDIRECTION_FILE}.tmp"
@@ -74,24 +123,38 @@ def sanitize_log_data(data):
     else:
         return data
 
+async def get_entity_name(client, entity_id):
+    """Resolve a chat name, using the state store to avoid repeated lookups"""
+    entity_id = str(entity_id)
+    name = state_store.get("entity_name", entity_id)
+    if name is None:
+        entity = await client.get_entity(int(entity_id))
+        name = getattr(entity, 'title', getattr(entity, 'first_name', 'Unknown'))
+        state_store.set("entity_name", entity_id, name, ENTITY_NAME_TTL)
+    return name
+
+async def get_entity_name_or_id(client, entity_id):
+    """Resolve a chat name, falling back to the ID when it cannot be resolved"""
+    try:
+        return await get_entity_name(client, entity_id)
+    except Exception as e:
+        print(f"ERROR resolving name for {entity_id}: {str(e)}")
+        logger.error(f"Could not resolve name for {entity_id}: {str(e)}")
+        return str(entity_id)
+
 async def get_client(phone):
-    """Create a client with retry logic to avoid database locks"""
-    session_path = f"{SESSION_PATH}/{phone}"
-    
+    """Create a client with retry logic to avoid database locks
+
+    Always uses the file session, which keeps the entity cache and is what
+    the forwarder reads. The state store only records where it lives.
+    """
+    session_path = state_store.get("session_path", phone) or f"{SESSION_PATH}/{phone}"
+
     # Try up to 3 times with a short delay
     for attempt in range(3):
         try:
-            # Use MemorySession to avoid SQLite database locks
-            if phone in memory_sessions:
-                # Reuse existing session from memory
-                print(f"Using existing memory session for {phone}")
-                client = TelegramClient(memory_sessions[phone], API_ID, API_HASH)
-            else:
-                print(f"Creating new client with file session: {session_path}")
-                # Load from file but use memory for operations
-                client = TelegramClient(session_path, API_ID, API_HASH)
-                memory_sessions[phone] = MemorySession()
-            
+            print(f"Creating new client with file session: {session_path}")
+            client = TelegramClient(session_path, API_ID, API_HASH)
             await client.connect()
             return client
         except Exception as e:
@@ -128,7 +191,7 @@ def send_code():
                 if not await client.is_user_authorized():
                     print("User not authorized, sending code request")
                     sent = await client.send_code_request(phone)
-                    phone_code_hashes[phone] = sent.phone_code_hash
+                    state_store.set("code_hash", phone, sent.phone_code_hash, CODE_HASH_TTL)
                     print(f"Code sent successfully, hash stored for: {phone}")
                     await client.disconnect()
                     return {"status": "Code sent"}
@@ -169,7 +232,7 @@ def verify_code():
             print("ERROR: Missing phone or code")
             return jsonify({"error": "Phone and code required"}), 400
 
-        phone_code_hash = phone_code_hashes.get(phone)
+        phone_code_hash = state_store.get("code_hash", phone)
         if not phone_code_hash:
             print(f"ERROR: No phone_code_hash found for {phone}")
             return jsonify({"error": "No phone_code_hash found. Request code again."}), 400
@@ -187,13 +250,13 @@ def verify_code():
                 await client.sign_in(phone=phone, code=code, phone_code_hash=phone_code_hash)
                 print("Sign in successful")
                 
-                # Save the session to file
-                await client.session.save()
+                # Save the session to file and remember where it is
+                client.session.save()
+                state_store.set("session_path", phone, f"{SESSION_PATH}/{phone}", SESSION_TTL)
                 
                 # Clear the code hash after successful verification
-                if phone in phone_code_hashes:
-                    del phone_code_hashes[phone]
-                    print(f"Cleared phone_code_hash for {phone}")
+                state_store.delete("code_hash", phone)
+                print(f"Cleared phone_code_hash for {phone}")
                     
                 await client.disconnect()
                 return {"status": "Login successful"}
@@ -287,6 +350,8 @@ def set_link():
         phone = data.get("phone")
         source_id = str(data.get("source_id"))
         destination_id = str(data.get("destination_id"))
+        priority = data.get("priority")
+        max_age = data.get("max_age")
 
         print(f"Phone: {phone}, Source ID: {source_id}, Destination ID: {destination_id}")
         logger.info(f"Setting link: {source_id} → {destination_id}")
@@ -295,6 +360,21 @@ def set_link():
             print("ERROR: Missing required fields")
             return jsonify({"error": "Missing required fields"}), 400
 
+        try:
+            priority = int(priority) if priority is not None else None
+            max_age = float(max_age) if max_age is not None else None
+        except (TypeError, ValueError, OverflowError):
+            print("ERROR: Invalid priority or max_age")
+            return jsonify({"error": "Invalid priority or max_age"}), 400
+
+        if priority is not None and priority < 1:
+            print("ERROR: Priority must be at least 1")
+            return jsonify({"error": "Priority must be at least 1"}), 400
+
+        if max_age is not None and not (math.isfinite(max_age) and max_age > 0):
+            print("ERROR: max_age must be a positive number of seconds")
+            return jsonify({"error": "max_age must be a positive number of seconds"}), 400
+
         lock = get_lock(phone)
 
         with lock:
@@ -302,6 +382,11 @@ def set_link():
                 try:
                     client = await get_client(phone)
 
+                    # Cache chat names before saving, so the link event stream
+                    # already has them when it sees the new link
+                    await get_entity_name_or_id(client, source_id)
+                    await get_entity_name_or_id(client, destination_id)
+
                     print(f"Adding link: {source_id} → {destination_id}")
                     if source_id not in active_redirections:
                         active_redirections[source_id] = []
@@ -310,6 +395,15 @@ def set_link():
                         save_redirections()
                         print("Link saved successfully")
 
+                    changes = {}
+                    if priority is not None:
+                        changes["priority"] = priority
+                    if max_age is not None:
+                        changes["max_age"] = max_age
+                    if changes:
+                        settings = update_link_settings(source_id, destination_id, changes)
+                        print(f"Link settings saved: {settings}")
+
                     await client.disconnect()
                     print("Disconnected from Telegram")
                     return {"status": "Link applied successfully"}
@@ -359,25 +453,19 @@ def get_links():
                 results = []
                 for sid, dests in active_redirections.items():
                     for did in dests:
-                        try:
-                            print(f"Resolving entity for source: {sid}")
-                            s_entity = await client.get_entity(int(sid))
-                            print(f"Resolving entity for destination: {did}")
-                            d_entity = await client.get_entity(int(did))
-                            
-                            source_name = getattr(s_entity, 'title', getattr(s_entity, 'first_name', 'Unknown'))
-                            dest_name = getattr(d_entity, 'title', getattr(d_entity, 'first_name', 'Unknown'))
-                            
-                            results.append({
-                                "source_id": sid,
-                                "destination_id": did,
-                                "source_name": source_name,
-                                "destination_name": dest_name,
-                            })
-                            print(f"Added link: {source_name} → {dest_name}")
-                        except Exception as e:
-                            print(f"ERROR resolving names for {sid} → {did}: {str(e)}")
-                            logger.error(f"Could not resolve names for {sid} → {did}: {str(e)}")
+                        print(f"Resolving entity for source: {sid}")
+                        source_name = await get_entity_name_or_id(client, sid)
+                        print(f"Resolving entity for destination: {did}")
+                        dest_name = await get_entity_name_or_id(client, did)
+
+                        # Unresolved links are still listed, like in /link-events
+                        results.append({
+                            "source_id": sid,
+                            "destination_id": did,
+                            "source_name": source_name,
+                            "destination_name": dest_name,
+                        })
+                        print(f"Added link: {source_name} → {dest_name}")
                 
                 await client.disconnect()
                 print(f"Found {len(results)} links")
@@ -401,6 +489,29 @@ def get_links():
         return jsonify({"error": "Server error: " + str(e)}), 500
 
 
+def link_events():
+    """Yield a snapshot followed by deltas for links, forwarder status and counters"""
+    snapshot, subscription = link_event_hub.subscribe()
+    try:
+        yield snapshot
+        while not subscription.closed:
+            message = subscription.next(EVENT_KEEPALIVE_INTERVAL)
+            # Keepalives also let the server notice clients that went away
+            yield message or ": keepalive\n\n"
+    finally:
+        link_event_hub.unsubscribe(subscription)
+
+@auth_api.route('/link-events', methods=['GET'])
+def link_events_stream():
+    print("========== RECEIVED /link-events REQUEST ==========")
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    }
+    return Response(stream_with_context(link_events()), mimetype="text/event-stream", headers=headers)
+
+
 @auth_api.route('/delete-link', methods=['POST'])
 def delete_link():
     print("========== RECEIVED /delete-link REQUEST ==========")
@@ -422,6 +533,7 @@ def delete_link():
             if not active_redirections[source_id]:
                 del active_redirections[source_id]
             save_redirections()
+            update_link_settings(source_id, destination_id)
             print("Link removed successfully")
             print("================================================")
             return jsonify({"status": "Link removed"}), 200
@@ -435,9 +547,7 @@ def delete_link():
         return jsonify({"error": "Server error: " + str(e)}), 500
 
 def get_lock(phone):
-    if phone not in session_locks:
-        session_locks[phone] = threading.Lock()
-    return session_locks[phone]
+    return state_store.get_lock(phone)
 
 # Debug endpoint to check if server is running
 @auth_api.route('/ping', methods=['GET'])
@@ -0,0 +1,108 @@
+# test_auth_state_store.py
+
+import os
+import tempfile
+import time
+import unittest
+
+from auth_state_store import MemoryStateStore, SQLiteStateStore, SQLiteLock
+
+class StateStoreTests:
+    """Behaviour shared by every store backend"""
+
+    def make_store(self, max_entries):
+        raise NotImplementedError
+
+    def test_get_returns_value_until_expiry(self):
+        store = self.make_store(10)
+        store.set("code_hash", "+1", "hash", 100)
+        store.set("code_hash", "+2", "hash", -1)
+
+        self.assertEqual(store.get("code_hash", "+1"), "hash")
+        self.assertIsNone(store.get("code_hash", "+2"))
+
+    def test_delete(self):
+        store = self.make_store(10)
+        store.set("code_hash", "+1", "hash", 100)
+        store.delete("code_hash", "+1")
+
+        self.assertIsNone(store.get("code_hash", "+1"))
+
+    def test_eviction_is_per_namespace(self):
+        store = self.make_store(3)
+        store.set("code_hash", "+1", "hash", 100)
+        for i in range(5):
+            store.set("entity_name", str(i), f"name {i}", 100)
+            # Keep the access order strictly increasing for the SQLite backend
+            time.sleep(0.001)
+
+        self.assertEqual(store.get("code_hash", "+1"), "hash")
+        self.assertEqual(
+            [store.get("entity_name", str(i)) for i in range(5)],
+            [None, None, "name 2", "name 3", "name 4"],
+        )
+
+
+class MemoryStateStoreTest(StateStoreTests, unittest.TestCase):
+
+    def make_store(self, max_entries):
+        return MemoryStateStore(max_entries=max_entries)
+
+    def test_held_lock_is_not_evicted(self):
+        store = self.make_store(1)
+        lock = store.get_lock("+1")
+        with lock:
+            with store.get_lock("+2"):
+                pass
+            # "+1" is held, so it must survive even though the store is over its bound
+            self.assertIs(store.locks.get("+1"), lock)
+
+        with store.get_lock("+3"):
+            pass
+        self.assertNotIn("+1", store.locks)
+
+    def test_lock_handed_out_is_not_evicted_before_use(self):
+        store = self.make_store(1)
+        lock = store.get_lock("+1")
+        with store.get_lock("+2"):
+            pass
+
+        self.assertIs(store.get_lock("+1"), lock)
+
+
+class SQLiteStateStoreTest(StateStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_store(self, max_entries):
+        return SQLiteStateStore(os.path.join(self.directory.name, "state.db"), max_entries=max_entries)
+
+    def test_second_lock_times_out_then_acquires_after_release(self):
+        store = self.make_store(10)
+        first = SQLiteLock(store, "+1")
+        second = SQLiteLock(store, "+1", timeout=0.2)
+
+        first.acquire()
+        try:
+            with self.assertRaises(TimeoutError):
+                second.acquire()
+        finally:
+            first.release()
+
+        with second:
+            pass
+
+    def test_lease_is_renewed_while_held(self):
+        store = self.make_store(10)
+        with SQLiteLock(store, "+1", ttl=0.3):
+            time.sleep(0.6)
+            with self.assertRaises(TimeoutError):
+                SQLiteLock(store, "+1", timeout=0.1).acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()
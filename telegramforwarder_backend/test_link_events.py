@@ -0,0 +1,131 @@
+# test_link_events.py
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import link_events
+from link_events import LinkEventHub, Subscription
+
+def parse(message):
+    """Split a formatted server-sent event into its name and data"""
+    lines = message.strip().split("\n")
+    return lines[0][len("event: "):], json.loads(lines[1][len("data: "):])
+
+
+class LinkEventHubTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.redirection_file = os.path.join(self.directory.name, "active_redirections.json")
+        self.status_file = os.path.join(self.directory.name, "forwarder_status.json")
+        self.hub = LinkEventHub(
+            self.redirection_file,
+            self.status_file,
+            lambda entity_id: f"chat {entity_id}",
+        )
+        self.mtime = time.time() - 100
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, data):
+        with open(path, "w") as f:
+            json.dump(data, f)
+        # Bump the mtime explicitly so back-to-back writes are always seen
+        self.mtime += 1
+        os.utime(path, (self.mtime, self.mtime))
+
+    def write_status(self, links, updated_at=None):
+        self.write(self.status_file, {
+            "running": True,
+            "clients": 1,
+            "updated_at": time.time() if updated_at is None else updated_at,
+            "links": links,
+        })
+
+    def test_link_added_and_removed(self):
+        self.write(self.redirection_file, {"1": ["2"]})
+        self.hub.poll()
+
+        self.write(self.redirection_file, {"3": ["4"]})
+        events = [parse(message) for message in self.hub.poll()]
+
+        self.assertEqual(events, [("links", {
+            "added": [{
+                "source_id": "3",
+                "destination_id": "4",
+                "source_name": "chat 3",
+                "destination_name": "chat 4",
+            }],
+            "removed": [{"source_id": "1", "destination_id": "2"}],
+        })])
+
+    def test_unchanged_files_produce_no_events(self):
+        self.write(self.redirection_file, {"1": ["2"]})
+        self.write_status({"1:2": {"forwarded": 1}})
+        self.hub.poll()
+
+        self.assertEqual(self.hub.poll(), [])
+
+    def test_only_changed_counters_are_sent(self):
+        self.write(self.redirection_file, {"1": ["2"], "3": ["4"]})
+        self.write_status({"1:2": {"forwarded": 1}, "3:4": {"forwarded": 5}})
+        self.hub.poll()
+
+        self.write_status({"1:2": {"forwarded": 2}, "3:4": {"forwarded": 5}})
+        events = [parse(message) for message in self.hub.poll()]
+
+        self.assertEqual(events, [("counters", {"1:2": {"forwarded": 2}})])
+
+    def test_forwarder_goes_stale_without_file_change(self):
+        self.write_status({})
+        self.hub.poll()
+        self.assertTrue(self.hub.forwarder["running"])
+
+        # Pretend the last status update is now older than the stale limit
+        self.hub.status["updated_at"] = time.time() - link_events.FORWARDER_STALE_AFTER - 1
+        events = [parse(message) for message in self.hub.poll()]
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], "forwarder")
+        self.assertFalse(events[0][1]["running"])
+
+    def test_snapshot_lists_current_links(self):
+        self.write(self.redirection_file, {"1": ["2"]})
+        snapshot, subscription = self.hub.subscribe()
+        self.hub.unsubscribe(subscription)
+
+        event, data = parse(snapshot)
+        self.assertEqual(event, "snapshot")
+        self.assertEqual(data["links"], [{
+            "source_id": "1",
+            "destination_id": "2",
+            "source_name": "chat 1",
+            "destination_name": "chat 2",
+        }])
+
+
+class SubscriptionTest(unittest.TestCase):
+
+    def test_events_are_returned_in_order(self):
+        subscription = Subscription()
+        subscription.push("a")
+        subscription.push("b")
+
+        self.assertEqual([subscription.next(0), subscription.next(0)], ["a", "b"])
+        self.assertIsNone(subscription.next(0))
+
+    def test_falling_behind_closes_the_stream(self):
+        subscription = Subscription(max_pending=2)
+        for message in ("a", "b", "c"):
+            subscription.push(message)
+
+        self.assertTrue(subscription.closed)
+        self.assertIsNone(subscription.next(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# test_send_scheduler.py
+
+import asyncio
+import time
+import unittest
+
+from send_scheduler import SendScheduler
+
+async def noop_send(source_id, destination_id, message):
+    pass
+
+def drain(scheduler):
+    """Return the destination order the worker would send queued messages in"""
+    order = []
+    link = scheduler.next_link()
+    while link is not None:
+        link.messages.popleft()
+        order.append(link.destination_id)
+        link = scheduler.next_link()
+    return order
+
+
+class SendSchedulerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_links_share_sends_by_priority(self):
+        scheduler = SendScheduler(noop_send)
+        scheduler.configure_link("1", "high", priority=3)
+        for i in range(20):
+            scheduler.enqueue("1", "low", i)
+        for i in range(6):
+            scheduler.enqueue("1", "high", i)
+
+        order = drain(scheduler)
+
+        # The high-priority link gets three sends for every low-priority one
+        self.assertEqual(order[:8], ["high", "high", "high", "low"] * 2)
+        self.assertEqual(order.count("low"), 20)
+
+    async def test_equal_priority_links_alternate(self):
+        scheduler = SendScheduler(noop_send)
+        for i in range(3):
+            scheduler.enqueue("1", "a", i)
+            scheduler.enqueue("1", "b", i)
+
+        self.assertEqual(drain(scheduler), ["a", "b"] * 3)
+
+    async def test_stale_messages_dropped_only_with_max_age(self):
+        scheduler = SendScheduler(noop_send)
+        scheduler.configure_link("1", "expiring", max_age=5)
+        scheduler.enqueue("1", "expiring", "old")
+        scheduler.enqueue("1", "expiring", "new")
+        scheduler.enqueue("1", "kept", "old")
+
+        # Age the first message on each link past max_age
+        for key in (("1", "expiring"), ("1", "kept")):
+            link = scheduler.links[key]
+            timestamp, message = link.messages[0]
+            link.messages[0] = (timestamp - 10, message)
+
+        self.assertEqual(sorted(drain(scheduler)), ["expiring", "kept"])
+        self.assertEqual(scheduler.links[("1", "expiring")].dropped, 1)
+        self.assertEqual(scheduler.links[("1", "kept")].dropped, 0)
+
+    async def test_worker_survives_send_errors(self):
+        sent = []
+
+        async def send(source_id, destination_id, message):
+            if message == "bad":
+                raise RuntimeError("send failed")
+            sent.append(message)
+
+        shutdown_event = asyncio.Event()
+        scheduler = SendScheduler(send)
+        scheduler.start(shutdown_event)
+        scheduler.enqueue("1", "2", "bad")
+        scheduler.enqueue("1", "2", "good")
+
+        deadline = time.monotonic() + 1
+        while not sent and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+        self.assertEqual(sent, ["good"])
+
+
+if __name__ == "__main__":
+    unittest.main()